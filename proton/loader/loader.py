@@ -18,17 +18,64 @@ along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
 """
 from __future__ import annotations
 from importlib import metadata
+import functools
 import os
+import re
 import threading
 import warnings
 from collections import namedtuple
-from typing import Optional
+from typing import Callable, Optional
+from weakref import WeakKeyDictionary
 
 from ..utils import Singleton
 
-PluggableComponent = namedtuple('PluggableComponent', ['priority', 'class_name', 'cls'])
+# type_name=class_name or type_name=-class_name, separated by commas (whitespace is accepted as well, for compatibility)
+_OVERRIDE_RE = re.compile(r'([^,\s=]+)=(-?[^,\s=]+)')
+
 PluggableComponentName = namedtuple('PluggableComponentName', ['type_name', 'class_name'])
 
+
+class PluggableComponent:
+    """An implementation of a type, as returned by :meth:`Loader.get_all`.
+
+    It can be unpacked as ``(priority, class_name, cls)``. ``validate`` is the ``_validate`` class method of ``cls``,
+    or ``None`` if it doesn't have one.
+    """
+    __slots__ = ('priority', 'class_name', 'cls', 'validate')
+
+    def __init__(self, priority: Optional[int], class_name: str, cls: type):
+        self.priority = priority
+        self.class_name = class_name
+        self.cls = cls
+        self.validate = getattr(cls, '_validate', None)
+
+    def __iter__(self):
+        return iter((self.priority, self.class_name, self.cls))
+
+    def __eq__(self, other):
+        if not isinstance(other, PluggableComponent):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return f"PluggableComponent(priority={self.priority!r}, class_name={self.class_name!r}, cls={self.cls!r})"
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_entry_points():
+    """Return the installed entry points. Scanning them is expensive (it walks every installed distribution),
+    so it's done only once per process (see :meth:`Loader.refresh_entry_points`)."""
+    return metadata.entry_points()
+
+
+def _priority_sort_key(component: PluggableComponent) -> tuple:
+    # Ties on priority are broken by class name, so the order is deterministic
+    return (component.priority, component.class_name)
+
+
 class Loader(metaclass=Singleton):
     """This is the loader for pluggable components. These components are identified by a type name (string)
     and a class name (also a string).
@@ -73,7 +120,11 @@ class Loader(metaclass=Singleton):
 
     def __init__(self):
         self.__known_types = {}
-        self.__name_resolution_cache = {}
+        # Keyed weakly, so it doesn't keep alive implementations that were replaced (see set_all)
+        self.__name_resolution_cache = WeakKeyDictionary()
+        self.__get_all_cache = {}
+        self.__get_all_results = {}
+        self.__parsed_overrides = (None, {})
         self.__lock = threading.Lock()
 
     def get(self, type_name: str, class_name: Optional[str] = None) -> type:
@@ -87,113 +138,248 @@ class Loader(metaclass=Singleton):
         :return: the class implementing type_name. (careful: it's a class, not an object!)
         :rtype: class
         """
+        # If caller specified the class he wanted, then we check only that.
+        if class_name is not None:
+            return self._get_by_name(type_name, class_name)
+
+        return self.__select(type_name, self.get_all(type_name))
+
+    def resolver(self, type_name: str) -> Callable[[], type]:
+        """Return a function giving the implementation for type_name, as :meth:`get` would.
+
+        The candidates are resolved once, when this method is called, so later changes of ``PROTON_LOADER_OVERRIDES``
+        or of the priorities are not taken into account. This is meant for callers that need the same type repeatedly.
+
+        :param type_name: extension type
+        :type type_name: str
+        :raises RuntimeError: if ``PROTON_LOADER_OVERRIDES`` is invalid. The returned function raises it if no valid
+            implementation can be found.
+        :return: function without arguments, returning the class implementing type_name
+        :rtype: Callable[[], type]
+        """
         acceptable_classes = self.get_all(type_name)
 
+        def resolve() -> type:
+            return self.__select(type_name, acceptable_classes)
+        return resolve
+
+    def __select(self, type_name: str, acceptable_classes: tuple[PluggableComponent, ...]) -> type:
+        """Return the first valid implementation from ``acceptable_classes`` (as sorted by :meth:`get_all`)."""
         for entry in acceptable_classes:
-            # If caller specified the class he wanted, then we check only that.
-            if class_name is not None:
-                if entry.class_name == class_name:
-                    return entry.cls
-                else:
-                    continue
-            
             # Invalid priority, just continue (this will fail anyway because we have ordered the list in get_all, but for what it costs I prefer to go through the list)
             if entry.priority is None:
                 continue
+            # The candidates might come from a resolver, skip the ones that were dropped since
+            if self.__known_types[type_name].get(entry.class_name) is not entry.cls:
+                continue
             # If we have a _validate class method, try to see if the object is indeed acceptable
-            if hasattr(entry.cls, '_validate'):
-                if entry.cls._validate():
+            if entry.validate is not None:
+                if entry.validate():
                     return entry.cls
                 else:
                     # If not, remove that from the acceptable types definitely (it's broken)
                     self.__known_types[type_name] = dict([(k,v) for k, v in self.__known_types[type_name].items() if v != entry.cls])
+                    self.__forget_resolved(type_name)
             else:
                 return entry.cls
 
         raise RuntimeError(f"Loader: couldn't find an acceptable implementation for {type_name}.")
 
+    def _get_by_name(self, type_name: str, class_name: str) -> type:
+        """Get a specific implementation of ``type_name``, without ordering all the implementations.
+
+        As with :meth:`get_all`, implementations excluded by ``PROTON_LOADER_OVERRIDES`` can still be obtained by name.
+
+        :raises RuntimeError: if there's no implementation named ``class_name``
+        :return: the class implementing type_name. (careful: it's a class, not an object!)
+        :rtype: class
+        """
+        self.__load_type(type_name)
+        cls = self.__known_types[type_name].get(class_name)
+        if cls is None:
+            raise RuntimeError(f"Loader: couldn't find an acceptable implementation for {type_name}.")
+        return cls
+
+    def __register(self, type_name: str, class_name: str, cls: type) -> None:
+        """Record what we need to know about an implementation once it's loaded, so it doesn't have to be looked up again
+        each time :meth:`get`/:meth:`get_all` are called."""
+        self.__name_resolution_cache[cls] = PluggableComponentName(type_name, class_name)
+
     @property
     def type_names(self) -> list[str]: 
         """
         :return: Return a list of the known type names
         :rtype: list[str]
         """
-        return [x[len(self.__loader_prefix):] for x in self._proton_entry_point_groups.keys()]
+        return [x[len(self.__loader_prefix):] for x in self._proton_entry_point_group_names]
 
-    @property
-    def _proton_entry_point_groups(self):
-        metadata_entry_points = metadata.entry_points()
+    @functools.cached_property
+    def _proton_entry_point_group_names(self) -> tuple[str, ...]:
+        """Names of the metadata groups used by the loader (without loading their entry points).
+
+        Listing the groups goes through every entry point, so it's done once (see :meth:`refresh_entry_points`).
+        """
+        metadata_entry_points = _cached_entry_points()
         try:
             # importlib.metadata.entry_points() uses the selectable interface in python >= 3.10
             groups = metadata_entry_points.groups
         except AttributeError:
             # importlib.metadata.entry_points() uses the dict interface in python < 3.10
-            return {
-                k: v
-                for k, v in metadata_entry_points.items()
-                if k.startswith(self.__loader_prefix)
-            }
-        return {
-            group: metadata_entry_points.select(group=group)
-            for group in groups if group.startswith(self.__loader_prefix)
-        }
-
-    def get_all(self, type_name: str) -> list[PluggableComponent]:
-        """Get a list of all implementations for ``type_name``.
+            groups = metadata_entry_points.keys()
+        return tuple(sorted(group for group in groups if group.startswith(self.__loader_prefix)))
+
+    def _proton_entry_points_for(self, type_name: str):
+        """:return: the entry points declared for ``type_name`` only
+        :rtype: Iterable[importlib.metadata.EntryPoint]
+        """
+        metadata_entry_points = _cached_entry_points()
+        metadata_group_name = self._get_metadata_group_for_typename(type_name)
+        try:
+            # importlib.metadata.entry_points() uses the selectable interface in python >= 3.10
+            select = metadata_entry_points.select
+        except AttributeError:
+            # importlib.metadata.entry_points() uses the dict interface in python < 3.10
+            return metadata_entry_points.get(metadata_group_name, ())
+        return select(group=metadata_group_name)
+
+    def get_all(self, type_name: str) -> tuple[PluggableComponent, ...]:
+        """Get all the implementations for ``type_name``, highest priority first.
 
         :param type_name: type of implementation to query for
         :type type_name: str
         :raises RuntimeError: if ``PROTON_LOADER_OVERRIDES`` has conflicts
         :return: Implementation for type_name (this includes the ones that are disabled)
-        :rtype: list[PluggableComponent]
+        :rtype: tuple[PluggableComponent, ...]
         """
 
-        # If we don't have already loaded the entry points, just do so
-        with self.__lock:
-            # We use a lock here because a known type should only be available after it has been loaded.
-            if type_name not in self.__known_types:
-                metadata_group_name = self._get_metadata_group_for_typename(type_name)
-                entry_points = self._proton_entry_point_groups.get(metadata_group_name, ())
-                self.__known_types[type_name] = {}
-                for ep in entry_points:
-                    if ep.name in self.__known_types[type_name]:
-                        del self.__known_types[type_name]
-                        raise RuntimeError(f"Loader error : found 2 modules with same name (that would create security issues)")
-                    try:
-                        self.__known_types[type_name][ep.name] = ep.load()
-                    except AttributeError:
-                        warnings.warn(f"Loader: couldn't load {type_name}/{ep.name}, is it installed properly?", RuntimeWarning, stacklevel=2)
-                        continue
-                    self.__name_resolution_cache[self.__known_types[type_name][ep.name]] = PluggableComponentName(type_name, ep.name)
+        self.__load_type(type_name)
 
         # We do this at runtime, because we want to make sure we can change it after start.
         overrides = os.environ.get('PROTON_LOADER_OVERRIDES', '')
-        overrides = [x.strip() for x in overrides.split()]
-        overrides = [x[len(type_name)+1:] for x in overrides if x.startswith(f'{type_name}=')]
 
-        force_class = set([x for x in overrides if not x.startswith('-')])
+        # Resolving the overrides only depends on the known types and PROTON_LOADER_OVERRIDES, so it's cached.
+        # Priorities are not: _get_priority() is allowed to depend on the runtime state (see environments).
+        cache_key = (type_name, overrides)
+        resolved = self.__get_all_cache.get(cache_key)
+        if resolved is None:
+            resolved = self.__resolve_overrides(type_name, overrides)
+            self.__get_all_cache[cache_key] = resolved
+        acceptable_entries, excluded_entries = resolved
+
+        # If the priorities didn't change since last time, neither did the result
+        priorities = tuple(cls._get_priority() for _, cls in acceptable_entries)
+        previous = self.__get_all_results.get(cache_key)
+        if previous is not None and previous[0] == priorities:
+            return previous[1]
+
+        acceptable_classes_with_prio = []
+        acceptable_classes_without_prio = []
+        for (class_name, cls), priority in zip(acceptable_entries, priorities):
+            if priority is None:
+                acceptable_classes_without_prio.append(PluggableComponent(None, class_name, cls))
+            else:
+                acceptable_classes_with_prio.append(PluggableComponent(priority, class_name, cls))
+        # Excluded entries are still listed (without priority)
+        for class_name, cls in excluded_entries:
+            acceptable_classes_without_prio.append(PluggableComponent(None, class_name, cls))
+
+        # Sort the entries with priority, highest first
+        acceptable_classes_with_prio.sort(key=_priority_sort_key, reverse=True)
+
+        # Returned as a tuple, so callers can't alter the cached value
+        components = tuple(acceptable_classes_with_prio + acceptable_classes_without_prio)
+        self.__get_all_results[cache_key] = (priorities, components)
+        return components
+
+    def __load_type(self, type_name: str) -> None:
+        """Load the entry points for ``type_name``, if it's not done yet."""
+        # If we don't have already loaded the entry points, just do so.
+        # The check is done once without the lock, so the common case (type already loaded) doesn't contend on it.
+        if type_name not in self.__known_types:
+            with self.__lock:
+                # We use a lock here because a known type should only be available after it has been loaded.
+                # Another thread might have loaded it while we were waiting, so check again.
+                if type_name not in self.__known_types:
+                    implementations = {}
+                    for ep in self._proton_entry_points_for(type_name):
+                        if ep.name in implementations:
+                            raise RuntimeError(f"Loader error : found 2 modules with same name (that would create security issues)")
+                        try:
+                            implementations[ep.name] = ep.load()
+                        except AttributeError:
+                            warnings.warn(f"Loader: couldn't load {type_name}/{ep.name}, is it installed properly?", RuntimeWarning, stacklevel=3)
+                            continue
+                        self.__register(type_name, ep.name, implementations[ep.name])
+                    self.__forget_resolved(type_name)
+                    # Only publish the type once it's fully loaded, as it's read without the lock
+                    self.__known_types[type_name] = implementations
+
+    def __resolve_overrides(self, type_name: str, overrides: str) -> tuple[list[tuple[str, type]], list[tuple[str, type]]]:
+        """Split the known implementations of ``type_name`` between the acceptable ones and the ones
+        excluded by ``PROTON_LOADER_OVERRIDES``.
+
+        :param type_name: type of implementation
+        :type type_name: str
+        :param overrides: raw value of ``PROTON_LOADER_OVERRIDES``
+        :type overrides: str
+        :raises RuntimeError: if ``PROTON_LOADER_OVERRIDES`` has conflicts
+        :return: ``(acceptable, excluded)``, both being lists of ``(class_name, class)``
+        :rtype: tuple[list[tuple[str, type]], list[tuple[str, type]]]
+        """
+        force_class, exclude_class = self.__parse_overrides(overrides).get(type_name, (set(), set()))
+
+        known = self.__known_types[type_name]
         if len(force_class) == 1:
-            force_class = list(force_class)[0]
-            if force_class in self.__known_types[type_name]:
-                acceptable_entry_points = [force_class]
+            force_class = next(iter(force_class))
+            # If the forced class doesn't exist, then nothing is acceptable
+            acceptable_entry_points = {force_class} if force_class in known else set()
         elif len(force_class) > 1:
             raise RuntimeError(f"Loader: PROTON_LOADER_OVERRIDES contains multiple force for {type_name}")
         else:
             # Load all entry_points, except those that are excluded by PROTON_LOADER_OVERRIDES
-            acceptable_entry_points = []
-            for k in self.__known_types[type_name].keys():
-                if '-' + k not in overrides:
-                    acceptable_entry_points.append(k)
+            acceptable_entry_points = known.keys() - exclude_class
+
+        acceptable = []
+        excluded = []
+        for k, v in known.items():
+            if k in acceptable_entry_points:
+                acceptable.append((k, v))
+            else:
+                excluded.append((k, v))
+        return acceptable, excluded
 
-        acceptable_classes = [(v._get_priority(), k, v) for k, v in self.__known_types[type_name].items() if k in acceptable_entry_points]
-        acceptable_classes += [(None, k, v) for k, v in self.__known_types[type_name].items() if k not in acceptable_entry_points]
-        acceptable_classes_with_prio = [PluggableComponent(priority, class_name, v) for priority, class_name, v in acceptable_classes if priority is not None]
-        acceptable_classes_without_prio = [PluggableComponent(priority, class_name, v) for priority, class_name, v in acceptable_classes if priority is None]
+    def __parse_overrides(self, overrides: str) -> dict[str, tuple[set[str], set[str]]]:
+        """Parse ``PROTON_LOADER_OVERRIDES``. The result is kept until the variable changes.
 
-        # Sort the entries with priority, highest first
-        acceptable_classes_with_prio.sort(reverse=True)
-        
-        return acceptable_classes_with_prio + acceptable_classes_without_prio
+        :param overrides: raw value of ``PROTON_LOADER_OVERRIDES``
+        :type overrides: str
+        :return: type_name -> ``(forced class names, excluded class names)``
+        :rtype: dict[str, tuple[set[str], set[str]]]
+        """
+        # Both values are stored together, so a concurrent reader never sees a mismatched pair
+        raw, parsed = self.__parsed_overrides
+        if raw == overrides:
+            return parsed
+
+        parsed = {}
+        for type_name, class_name in _OVERRIDE_RE.findall(overrides):
+            force_class, exclude_class = parsed.setdefault(type_name, (set(), set()))
+            if class_name.startswith('-'):
+                exclude_class.add(class_name[1:])
+            else:
+                force_class.add(class_name)
+
+        self.__parsed_overrides = (overrides, parsed)
+        return parsed
+
+    def __forget_resolved(self, type_name: Optional[str] = None) -> None:
+        """Drop the cached override resolution and results for ``type_name`` (or for all types if ``None``)."""
+        if type_name is None:
+            self.__get_all_cache = {}
+            self.__get_all_results = {}
+        else:
+            self.__get_all_cache = {k: v for k, v in self.__get_all_cache.items() if k[0] != type_name}
+            self.__get_all_results = {k: v for k, v in self.__get_all_results.items() if k[0] != type_name}
 
     def get_name(self, cls: type) -> Optional[PluggableComponentName]:
         """Return the type_name and class_name corresponding to the class in parameter.
@@ -208,7 +394,38 @@ class Loader(metaclass=Singleton):
     def reset(self) -> None:
         """Erase the loader cache. (useful for tests)"""
         self.__known_types = {}
-        self.__name_resolution_cache = {}
+        self.__name_resolution_cache = WeakKeyDictionary()
+        self.__forget_resolved()
+
+    def prewarm(self) -> threading.Thread:
+        """Load the implementations of all the known types in a background thread.
+
+        Loading a type imports all its implementations, which otherwise happens during the first :meth:`get`. Applications
+        can call this early during their startup, to take this off the path of their first request.
+
+        :return: the (daemon) thread doing the work, already started
+        :rtype: threading.Thread
+        """
+        thread = threading.Thread(target=self._prewarm, name='proton-loader-prewarm', daemon=True)
+        thread.start()
+        return thread
+
+    def _prewarm(self) -> None:
+        for type_name in self.type_names:
+            try:
+                self.get_all(type_name)
+            except RuntimeError:
+                # Nothing is cached for a type that fails to load, so the error will be raised again to the actual caller
+                continue
+
+    def refresh_entry_points(self) -> None:
+        """Forget the cached entry points, so they are scanned again on next use.
+
+        This is only needed if packages have been installed/removed while the process is running (or for tests).
+        Already loaded types are kept, use :meth:`reset` to drop them too.
+        """
+        _cached_entry_points.cache_clear()
+        self.__dict__.pop('_proton_entry_point_group_names', None)
 
     def set_all(self, type_name: str, implementations : dict[str, type]):
         """Set a defined set of implementation for a given ``type_name``.
@@ -220,9 +437,10 @@ class Loader(metaclass=Singleton):
         :param implementations: Dictionary implementation name -> implementation class
         :type implementations: dict[str, class]
         """
-        self.__known_types[type_name] = implementations
         for class_name, cls in implementations.items():
-            self.__name_resolution_cache[cls] = PluggableComponentName(type_name, class_name)
+            self.__register(type_name, class_name, cls)
+        self.__forget_resolved(type_name)
+        self.__known_types[type_name] = implementations
 
     def _get_metadata_group_for_typename(self, type_name: str) -> str:
         """Return the metadata group name for type_name
@@ -28,7 +28,16 @@ from ..loader import Loader
 
 import asyncio
 import base64
+import binascii
+import collections
+import contextvars
+import functools
+import inspect
+import itertools
 import random
+import threading
+import warnings
+import weakref
 
 from ..utils import ExecutionEnvironment
 
@@ -48,26 +57,253 @@ WO4BAMcm1u02t4VKw++ttECPt+HUgPUq5pqQWe5Q2cW4TMsE
 SRP_MODULUS_KEY_FINGERPRINT = "248097092b458509c508dac0350585c4e9518f26"
 
 
+# Marker for attributes that aren't set yet
+_UNSET = object()
+
+
+@functools.lru_cache(maxsize=None)
+def _pgpy_modulus_key():
+    """Return :data:`SRP_MODULUS_KEY` parsed with PGPy (done once per process), or None if PGPy isn't available.
+
+    PGPy verifies the modulus signature in-process, without the gpg subprocess used by python-gnupg.
+    """
+    with warnings.catch_warnings():
+        # PGPy is noisy (deprecation warnings on import), none of it matters for a pinned key
+        warnings.simplefilter('ignore')
+        try:
+            import pgpy
+        except ImportError:
+            return None
+        modulus_key, _ = pgpy.PGPKey.from_blob(SRP_MODULUS_KEY)
+    return modulus_key
+
+
+# Verifying with PGPy also warns about checks it doesn't implement (self-signatures, revocations), which don't matter
+# for a pinned key either. Only these warnings are filtered out.
+warnings.filterwarnings('ignore', message='TODO: ', category=UserWarning, module=r'pgpy\.')
+
+
+_RetryPolicy = collections.namedtuple('_RetryPolicy', ['attempts', 'base_delay', 'max_delay', 'jitter'])
+_RetryPolicy.__doc__ = """How to retry a request failing with a given HTTP code: at most ``attempts`` attempts in total,
+waiting ``min(max_delay, base_delay * 2**attempt) * (1 + random() * jitter)`` seconds between them (unless the API
+tells us how long to wait)."""
+
+# Policies for HTTP codes on which requests are retried, by HTTP code
+RETRY_POLICY = {
+    408: _RetryPolicy(3, 1.0, 30, 0.5),
+    502: _RetryPolicy(3, 1.0, 30, 0.5),
+    429: _RetryPolicy(3, 1.0, 30, 0.5),
+    503: _RetryPolicy(3, 1.0, 30, 0.5),
+}
+
+# Same, for refreshing tokens (409 indicates a race condition on the DB, and the request should be performed again)
+REFRESH_RETRY_POLICY = {
+    409: _RetryPolicy(3, 1.0, 30, 0.5),
+    429: _RetryPolicy(3, 1.0, 30, 0.5),
+    503: _RetryPolicy(3, 1.0, 30, 0.5),
+}
+
+# Maximum number of attempts of a request on which the session keeps having to be refreshed
+REFRESH_ATTEMPTS = 3
+
+
+# Generator for retry jitter, not shared with the global one of the random module
+_rand = random.Random().random # nosec (no crypto risk here of using an unsafe generator)
+
+
+async def _sleep_backoff(attempt: int, base_delay: float, max_delay: float, jitter: float, retry_after: Optional[int] = None) -> None:
+    """Wait before retrying, with an exponential backoff.
+
+    :param attempt: number of the attempt that just failed, starting at 0
+    :type attempt: int
+    :param base_delay: delay after the first attempt, in seconds (before jitter)
+    :type base_delay: float
+    :param max_delay: maximum delay, in seconds (before jitter)
+    :type max_delay: float
+    :param jitter: maximum ratio of the delay to add randomly
+    :type jitter: float
+    :param retry_after: delay requested by the API, in seconds. If set, it's used as is.
+    :type retry_after: Optional[int]
+    """
+    if retry_after is not None:
+        delay = retry_after
+    else:
+        delay = min(max_delay, base_delay * (2 ** attempt)) * (1 + _rand() * jitter) # nosec (no crypto risk here of using an unsafe generator)
+    await asyncio.sleep(delay)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_transport_factory_cls() -> type:
+    """Return :class:`proton.session.transports.TransportFactory`.
+
+    The transports are imported lazily (they pull optional dependencies), and only once.
+    """
+    from .transports import TransportFactory
+    return TransportFactory
+
+
+@functools.lru_cache(maxsize=None)
+def _get_async_api_request_raw():
+    """Return :func:`proton.session.transports.base._async_api_request_raw` (imported lazily, see :func:`_get_transport_factory_cls`)."""
+    from .transports.base import _async_api_request_raw
+    return _async_api_request_raw
+
+
+# Event loops used by sync_wrapper, one per thread. They are kept across calls (creating and tearing down a loop
+# for each call is costly, and it prevents reusing anything bound to it), and are closed when their thread ends
+# (i.e. when its thread-local holder is released), or at exit.
+_sync_loops = threading.local()
+
+
+class _SyncLoopHolder:
+    """Holds the event loop of a thread, so that the loop gets closed once the holder is released."""
+    __slots__ = ('loop', '__weakref__')
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+
+
+def _get_sync_loop() -> asyncio.AbstractEventLoop:
+    """Return the event loop used to run synchronous calls in the current thread, creating it if needed.
+
+    :return: event loop for the current thread
+    :rtype: asyncio.AbstractEventLoop
+    """
+    holder = getattr(_sync_loops, 'holder', None)
+    if holder is None or holder.loop.is_closed():
+        loop = asyncio.new_event_loop()
+        holder = _sync_loops.holder = _SyncLoopHolder(loop)
+        # weakref.finalize also calls it at exit, for loops whose thread is still alive
+        weakref.finalize(holder, _close_sync_loop, loop)
+    return holder.loop
+
+
+def _close_sync_loop(loop: asyncio.AbstractEventLoop):
+    """Close an event loop created by :func:`_get_sync_loop`, unless it is closed or in use.
+
+    :param loop: event loop to close
+    :type loop: asyncio.AbstractEventLoop
+    """
+    if loop.is_closed() or loop.is_running():
+        return
+    try:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+    except RuntimeError:
+        # Another loop is running in the thread releasing the holder: async generators can't be finalized from here
+        pass
+    finally:
+        loop.close()
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_sync_wrapper(parameters: str, arguments: str):
+    """Compile the code of a synchronous wrapper, for a given signature (see :func:`sync_wrapper`).
+
+    :param parameters: parameters of the wrapper, as in its definition (defaults are names from the global namespace)
+    :type parameters: str
+    :param arguments: arguments to pass to the wrapped coroutine function, as in a call
+    :type arguments: str
+    :return: code object, that defines ``wrapped_f`` when executed (with the globals in :data:`_SYNC_WRAPPER_GLOBALS`)
+    """
+    source = (
+        f"def wrapped_f({parameters}):\n"
+        f"    try:\n"
+        f"        __sync_get_running_loop()\n"
+        f"    except __sync_RuntimeError:\n"
+        f"        return __sync_get_sync_loop().run_until_complete(__sync_wrapped_f({arguments}))\n"
+        f"    raise __sync_RuntimeError(__sync_error_message)\n"
+    )
+    return compile(source, '<sync_wrapper>', 'exec')
+
+
+# Globals used by the code of the generated wrappers (f is the wrapped coroutine function). The names are unlikely
+# to be used by parameters, which would shadow them: sync_wrapper doesn't generate a wrapper in that case.
+_SYNC_WRAPPER_GLOBALS = ('__sync_wrapped_f', '__sync_get_running_loop', '__sync_get_sync_loop', '__sync_RuntimeError', '__sync_error_message')
+_SYNC_WRAPPER_ERROR_MESSAGE = "It's forbidden to call sync_wrapped functions from an async one, please await directly the async one"
+
+
 def sync_wrapper(f):
+    """Make a synchronous function running the coroutine function ``f`` (on the event loop of the thread, see :func:`_get_sync_loop`).
+
+    The wrapper is generated with the same parameters as ``f``, so calling it doesn't need to pack and unpack arguments.
+    """
+    signature_parameters = inspect.signature(f).parameters
+    if any(name in signature_parameters for name in _SYNC_WRAPPER_GLOBALS):
+        return _generic_sync_wrapper(f)
+
+    namespace = dict(zip(_SYNC_WRAPPER_GLOBALS, (f, asyncio.get_running_loop, _get_sync_loop, RuntimeError, _SYNC_WRAPPER_ERROR_MESSAGE)))
+    parameters = []
+    arguments = []
+    keyword_only_marker_needed = True
+    positional_only_count = 0
+    for idx, param in enumerate(signature_parameters.values()):
+        if param.kind == param.VAR_POSITIONAL:
+            parameters.append(f'*{param.name}')
+            arguments.append(f'*{param.name}')
+            keyword_only_marker_needed = False
+            continue
+        if param.kind == param.VAR_KEYWORD:
+            parameters.append(f'**{param.name}')
+            arguments.append(f'**{param.name}')
+            continue
+
+        if param.kind == param.KEYWORD_ONLY:
+            if keyword_only_marker_needed:
+                parameters.append('*')
+                keyword_only_marker_needed = False
+            arguments.append(f'{param.name}={param.name}')
+        else:
+            arguments.append(param.name)
+
+        if param.default is param.empty:
+            parameters.append(param.name)
+        else:
+            # Defaults are evaluated when the wrapper is defined, so these names can't be shadowed by parameters
+            namespace[f'__sync_default_{idx}'] = param.default
+            parameters.append(f'{param.name}=__sync_default_{idx}')
+
+        if param.kind == param.POSITIONAL_ONLY:
+            # They are the first parameters, so this closes the positional only ones so far
+            positional_only_count = len(parameters)
+
+    if positional_only_count:
+        parameters.insert(positional_only_count, '/')
+
+    exec(_compile_sync_wrapper(', '.join(parameters), ', '.join(arguments)), namespace) # nosec (the code is generated from the signature of f)
+    return _update_sync_wrapper(namespace['wrapped_f'], f)
+
+
+def _generic_sync_wrapper(f):
+    """Same as :func:`sync_wrapper`, but with a generic ``*a, **kw`` signature."""
     def wrapped_f(*a, **kw):
         try:
-            loop = asyncio.get_running_loop()
-            newloop = False
+            asyncio.get_running_loop()
         except RuntimeError:
-            newloop = True
+            return _get_sync_loop().run_until_complete(f(*a, **kw))
+        raise RuntimeError(_SYNC_WRAPPER_ERROR_MESSAGE)
+    return _update_sync_wrapper(wrapped_f, f)
 
-        if not newloop:
-            raise RuntimeError("It's forbidden to call sync_wrapped functions from an async one, please await directly the async one")
-        
-        loop = asyncio.new_event_loop()
-        try:
-            return loop.run_until_complete(f(*a, **kw))
-        finally:
-            loop.close()
+
+def _update_sync_wrapper(wrapped_f, f):
+    """Give the wrapper of ``f`` the module and names of ``f`` (the generated ones would have no module), and its docstring."""
+    wrapped_f.__module__ = f.__module__
+    wrapped_f.__name__ = f.__name__
+    wrapped_f.__qualname__ = f.__qualname__
     wrapped_f.__doc__ = f"Synchronous wrapper for :meth:`{f.__name__}`"
     return wrapped_f
 
 class Session:
+    # Sessions can be numerous (i.e. one per user), so don't give them a __dict__.
+    # __weakref__ is needed by transports, which only keep a weak reference to their session.
+    __slots__ = (
+        '_Session__appversion', '_Session__user_agent',
+        '_Session__UID', '_Session__AccessToken', '_Session__RefreshToken', '_Session__Scopes', '_Session__AccountName', '_Session__2FA', '_Session__extrastate',
+        '_Session__refresh_revision', '_Session__environment', '_Session__gnupg_for_modulus', '_Session__transport', '_Session__transport_factory',
+        '_Session__can_run_requests', '_Session__persistence_observers', '_Session__persistence_observers_reversed',
+        '_Session__state_cache',
+        '__weakref__',
+    )
+
     def __init__(self, appversion : str = "Other", user_agent:str="None"):
         """Get a session towards the Proton API.
 
@@ -105,17 +341,21 @@ class Session:
 
         #Lazy initialized by api request
         self.__transport = None
+        #None means the default one, see transport_factory
         self.__transport_factory = None
 
-        self.transport_factory = None
-
-        #Lazy initialized by request lock/unlock
+        #Lazy initialized by request lock/unlock (one asyncio.Event per event loop, see _get_gate)
         self.__can_run_requests = None
 
         #Lazy initialized by environment:
         self.__environment = None
 
-        self.__persistence_observers = []
+        #Observers, in registration order and reversed (they're notified many more times than registered)
+        self.__persistence_observers = ()
+        self.__persistence_observers_reversed = ()
+
+        #Cached state (copied by __getstate__), None when it needs to be built again (see _mutate)
+        self.__state_cache = None
 
 
     async def async_api_request(self, endpoint,
@@ -149,48 +389,46 @@ class Session:
         :rtype: dict
         """
 
-        # We might need to loop
-        attempts = 3
-        stored_exception = None  # in case of too many attempts, raise instead of returning None
-        while attempts > 0:
-            attempts -= 1
-            try:
-                refresh_revision_at_start = self.__refresh_revision
-                return await self.__async_api_request_internal(endpoint, jsondata, data, additional_headers, method, params, no_condition_check)
-            except ProtonAPIError as e:
-                stored_exception = e
-                # We have a missing scope.
-                if e.http_code == 403:
-                    # If we need a 2FA authentication, then ask for it by sending a specific exception.
-                    if self.needs_twofa:
-                        raise ProtonAPI2FANeeded.from_proton_api_error(e)
-                    else:
-                        # Otherwise, just throw the 403
-                        raise ProtonAPIMissingScopeError.from_proton_api_error(e)
-                #401: token expired
-                elif e.http_code == 401:
-                    #If we can refresh, than do it and retry
-                    if await self.async_refresh(only_when_refresh_revision_is=refresh_revision_at_start, no_condition_check=no_condition_check):
-                        continue
+        # We might need to loop. API errors are handled on the raw reply, and exceptions are only created for the caller.
+        for attempt in itertools.count():
+            refresh_revision_at_start = self.__refresh_revision
+            http_code, http_headers, json_data = await self.__async_api_request_internal_raw(endpoint, jsondata, data, additional_headers, method, params, no_condition_check)
+            body_code = json_data.get('Code')
+            if body_code in (1000, 1001):
+                return json_data
+            http_headers = dict(http_headers)
+
+            # We have a missing scope.
+            if http_code == 403:
+                # If we need a 2FA authentication, then ask for it by sending a specific exception.
+                if self.needs_twofa:
+                    raise ProtonAPI2FANeeded(http_code, http_headers, json_data)
+                else:
+                    # Otherwise, just throw the 403
+                    raise ProtonAPIMissingScopeError(http_code, http_headers, json_data)
+            #401: token expired
+            elif http_code == 401:
+                #If we can refresh, than do it and retry
+                if not await self.async_refresh(only_when_refresh_revision_is=refresh_revision_at_start, no_condition_check=no_condition_check):
                     #Else, fail :-(
-                    else:
-                        raise ProtonAPIAuthenticationNeeded.from_proton_api_error(e)
-                #422 + 9001: Human verification needed
-                elif e.http_code == 422 and e.body_code == 9001:
-                    raise ProtonAPIHumanVerificationNeeded.from_proton_api_error(e)
-                #Invalid human verification token
-                elif e.body_code == 12087:
-                    raise ProtonAPIHumanVerificationNeeded.from_proton_api_error(e)
-                #These are codes which require and immediate retry
-                elif e.http_code in (408, 502):
+                    raise ProtonAPIAuthenticationNeeded(http_code, http_headers, json_data)
+                if attempt + 1 < REFRESH_ATTEMPTS:
                     continue
-                #These not, let's retry more gracefully
-                elif e.http_code in (429, 503):
-                    await self.__sleep_for_exception(e)
+            #422 + 9001: Human verification needed
+            elif http_code == 422 and body_code == 9001:
+                raise ProtonAPIHumanVerificationNeeded(http_code, http_headers, json_data)
+            #Invalid human verification token
+            elif body_code == 12087:
+                raise ProtonAPIHumanVerificationNeeded(http_code, http_headers, json_data)
+            #These are codes on which we retry, after waiting a bit
+            elif http_code in RETRY_POLICY:
+                policy = RETRY_POLICY[http_code]
+                if attempt + 1 < policy.attempts:
+                    await self.__sleep_before_retry(http_headers, attempt, policy)
                     continue
-                #Something else, throw
-                raise
-        raise stored_exception  # if we have reached that point without returning any value, an exception should have been stored
+            #Something else (or too many attempts), throw
+            break
+        raise ProtonAPIError(http_code, http_headers, json_data)
 
     async def async_authenticate(self, username: str, password: str, client_secret: str = None, no_condition_check: bool = False, additional_headers=None) -> bool:
         """Authenticate against Proton API
@@ -220,9 +458,9 @@ class Session:
                                                                     no_condition_check=True,
                                                                     additional_headers=additional_headers)
 
-            modulus = self._verify_modulus(info_response['Modulus'])
-            server_challenge = base64.b64decode(info_response["ServerEphemeral"])
-            salt = base64.b64decode(info_response["Salt"])
+            modulus = await self._verify_modulus(info_response['Modulus'])
+            server_challenge = binascii.a2b_base64(info_response["ServerEphemeral"])
+            salt = binascii.a2b_base64(info_response["Salt"])
             version = info_response["Version"]
 
             usr = PmsrpUser(password, modulus)
@@ -235,10 +473,8 @@ class Session:
             # Send response
             payload = {
                 "Username": username,
-                "ClientEphemeral": base64.b64encode(client_challenge).decode(
-                    'utf8'
-                ),
-                "ClientProof": base64.b64encode(client_proof).decode('utf8'),
+                "ClientEphemeral": binascii.b2a_base64(client_challenge, newline=False).decode('ascii'),
+                "ClientProof": binascii.b2a_base64(client_proof, newline=False).decode('ascii'),
                 "SRPSession": info_response["SRPSession"],
             }
             if client_secret is not None:
@@ -254,20 +490,18 @@ class Session:
             if "ServerProof" not in auth_response:
                 return False
 
-            usr.verify_session(base64.b64decode(auth_response["ServerProof"]))
+            usr.verify_session(binascii.a2b_base64(auth_response["ServerProof"]))
             if not usr.authenticated():
                 raise ProtonCryptoError('Invalid server proof')
 
-            self.__UID = auth_response['UID']
-            self.__AccessToken = auth_response['AccessToken']
-            self.__RefreshToken = auth_response['RefreshToken']
-            self.__Scopes = auth_response["Scopes"]
-            self.__AccountName = username
-
-            if '2FA' in auth_response:
-                self.__2FA = auth_response['2FA']
-            else:
-                self.__2FA = None
+            self._mutate(
+                UID=auth_response['UID'],
+                AccessToken=auth_response['AccessToken'],
+                RefreshToken=auth_response['RefreshToken'],
+                Scopes=auth_response["Scopes"],
+                AccountName=username,
+                **{'2FA': auth_response.get('2FA', None)}
+            )
 
             return True
         finally:
@@ -291,9 +525,9 @@ class Session:
             ret = await self.__async_api_request_internal('/auth/2fa', {
                 "TwoFactorCode": code
             }, no_condition_check=True, additional_headers=additional_headers)
-            self.__Scopes = ret['Scopes']
+            self._mutate(Scopes=ret['Scopes'])
             if ret.get('Code') == 1000:
-                self.__2FA = None
+                self._mutate(**{'2FA': None})
                 return True
             
             return False
@@ -329,14 +563,12 @@ class Session:
 
         self._requests_lock(no_condition_check)
 
-        #Increment the refresh revision counter, so we don't refresh multiple times
-        self.__refresh_revision += 1
-
-        attempts = 3
-
         try:
-            while attempts > 0:
-                attempts -= 1
+            #Increment the refresh revision counter, so we don't refresh multiple times
+            #(done once the lock is held, so the session is always unlocked afterwards)
+            self._mutate(refresh_revision=self.__refresh_revision + 1)
+
+            for attempt in itertools.count():
                 try:
                     refresh_response = await self.__async_api_request_internal('/auth/refresh', {
                         "ResponseType": "token",
@@ -344,20 +576,22 @@ class Session:
                         "RefreshToken": self.__RefreshToken,
                         "RedirectURI": "http://protonmail.ch"
                     }, no_condition_check=True, additional_headers=additional_headers)
-                    self.__AccessToken = refresh_response["AccessToken"]
-                    self.__RefreshToken = refresh_response["RefreshToken"]
-                    self.__Scopes = refresh_response["Scopes"]
+                    self._mutate(
+                        AccessToken=refresh_response["AccessToken"],
+                        RefreshToken=refresh_response["RefreshToken"],
+                        Scopes=refresh_response["Scopes"]
+                    )
                     return True
 
                 except ProtonAPIError as e:
                     #https://confluence.protontech.ch/display/API/Authentication%2C+sessions%2C+and+tokens#Authentication,sessions,andtokens-RefreshingSessions
-                    if e.http_code == 409:
-                        #409 Conflict - Indicates a race condition on the DB, and the request should be performed again
-                        continue
-                    #We're probably jailed, just retry later
-                    elif e.http_code in (429, 503):
-                        await self.__sleep_for_exception(e)
-                        continue
+                    #409 Conflict - Indicates a race condition on the DB, and the request should be performed again
+                    #429/503 - We're probably jailed, just retry later
+                    if e.http_code in REFRESH_RETRY_POLICY:
+                        policy = REFRESH_RETRY_POLICY[e.http_code]
+                        if attempt + 1 < policy.attempts:
+                            await self.__sleep_before_retry(e.http_headers, attempt, policy)
+                            continue
                     elif e.http_code in (400, 422):
                         #Needs re-login
                         self._clear_local_data()
@@ -408,7 +642,7 @@ class Session:
                                                           additional_headers=additional_headers)
             ret = await self.__async_api_request_internal('/auth/scopes', no_condition_check=True,
                                                           additional_headers=additional_headers)
-            self.__Scopes = ret['Scopes']
+            self._mutate(Scopes=ret['Scopes'])
             return True
         finally:
             self._requests_unlock(no_condition_check)
@@ -471,10 +705,12 @@ class Session:
         self._requests_lock(no_condition_check)
         try:
             ret = await self.async_api_request(f"/auth/v4/sessions/forks/{selector}", method='GET', no_condition_check=True)
-            self.__UID = ret['UID']
-            self.__RefreshToken = ret['RefreshToken']
-            self.__AccessToken = ret['AccessToken']
-            self.__Scopes = ret['Scopes']
+            self._mutate(
+                UID=ret['UID'],
+                RefreshToken=ret['RefreshToken'],
+                AccessToken=ret['AccessToken'],
+                Scopes=ret['Scopes']
+            )
             return ret['Payload']
         finally:
             self._requests_unlock(no_condition_check)
@@ -503,16 +739,31 @@ class Session:
 
         :type observer: object
         """
-        self.__persistence_observers.append(observer)
+        self.__persistence_observers = self.__persistence_observers + (observer,)
+        self.__persistence_observers_reversed = self.__persistence_observers[::-1]
 
     def _clear_local_data(self) -> None:
         """Clear locally cache data for logout (or equivalently, when the session is "lost")."""
-        self.__UID = None
-        self.__AccessToken = None
-        self.__RefreshToken = None
-        self.__Scopes = None
-        self.__2FA = None
-        self.__extrastate = {}
+        self._mutate(UID=None, AccessToken=None, RefreshToken=None, Scopes=None, extrastate={}, **{'2FA': None})
+
+    def _mutate(self, **changes) -> None:
+        """Change attributes that are part of the persisted state, and invalidate the cached state (see :meth:`__getstate__`).
+        All such changes have to go through this method.
+
+        The cached state is kept if nothing actually changes (i.e. clearing an already empty session), so that it isn't
+        built again needlessly.
+
+        :param changes: new values, by attribute name (without the ``_Session__`` prefix)
+        """
+        changed = False
+        for attr, value in changes.items():
+            attr = '_Session__' + attr
+            if not changed and getattr(self, attr, _UNSET) == value:
+                continue
+            setattr(self, attr, value)
+            changed = True
+        if changed:
+            self.__state_cache = None
 
     @property
     def transport_factory(self):
@@ -520,24 +771,26 @@ class Session:
 
         If the property is set to a class, it will be wrapped in a factory.
 
-        If the property is set to None, then the default ``transport`` will be obtained from :class:`.Loader`.
+        If the property is set to None, then the default ``transport`` will be obtained from :class:`.Loader` (when first needed).
         """
+        if self.__transport_factory is None:
+            self.__transport_factory = _get_transport_factory_cls()(Loader.get('transport'))
         return self.__transport_factory
 
     @transport_factory.setter
     def transport_factory(self, new_transport_factory):
-        from .transports import TransportFactory
-        from ..loader import Loader
+        # Same factory => nothing to do (and keep the current transport)
+        if new_transport_factory is self.__transport_factory:
+            return
 
         self.__transport = None
-        # If we don't set a new transport factory, then let's create a default one
+        # If we don't set a new transport factory, then the default one will be created when needed
         if new_transport_factory is None:
-            default_transport = Loader.get('transport')
-            self.__transport_factory = TransportFactory(default_transport)
-        elif isinstance(new_transport_factory, TransportFactory):
+            self.__transport_factory = None
+        elif isinstance(new_transport_factory, _get_transport_factory_cls()):
             self.__transport_factory = new_transport_factory
         else:
-            self.__transport_factory = TransportFactory(new_transport_factory)
+            self.__transport_factory = _get_transport_factory_cls()(new_transport_factory)
 
     @property
     def appversion(self) -> str:
@@ -608,7 +861,7 @@ class Session:
         """
         if self.__environment is None:
             from proton.loader import Loader
-            self.__environment = Loader.get('environment')()
+            self._mutate(environment=Loader.get('environment')())
         return self.__environment
 
     @environment.setter
@@ -627,22 +880,18 @@ class Session:
         
         if self.__environment is not None:
             raise ValueError("Cannot change environment of an established session (that would create security issues)!")
-        self.__environment = newvalue
+        self._mutate(environment=newvalue)
 
     def __setstate__(self, data):
-        # If we're running an unpickle, then the object constructor hasn't been called, so we need to populate __dict__
-        for attr, default in (('gnupg_for_modulus', None), ('can_run_requests', None), ('transport', None), ('persistence_observers', [])):
-            if '_Session__' + attr not in self.__dict__:
-                self.__dict__['_Session__' + attr] = default
+        # If we're running an unpickle, then the object constructor hasn't been called, so we need to populate the attributes
+        for attr, default in (('gnupg_for_modulus', None), ('can_run_requests', None), ('transport', None), ('persistence_observers', ()), ('persistence_observers_reversed', ()), ('transport_factory', None)):
+            if not hasattr(self, '_Session__' + attr):
+                setattr(self, '_Session__' + attr, default)
 
         # Restore data from LastUseData if we don't have it already (allow pickle load)
         for attr, default in (('2FA', None), ('appversion', 'Other'), ('user_agent', 'None'), ('refresh_revision', 0)):
-            if '_Session__' + attr not in self.__dict__:
-                self.__dict__['_Session__' + attr] = data.get('LastUseData', {}).get(attr, default)
-        
-        # We don't pickle the transport, so if not set just use the default
-        if '_Session__transport_factory' not in self.__dict__:
-            self.transport_factory = None
+            if not hasattr(self, '_Session__' + attr):
+                setattr(self, '_Session__' + attr, data.get('LastUseData', {}).get(attr, default))
 
         self.__UID = data.get('UID', None)
         self.__AccessToken = data.get('AccessToken', None)
@@ -660,7 +909,21 @@ class Session:
         # Store everything we don't know about in extrastate
         self.__extrastate = dict([(k, v) for k, v in data.items() if k not in ('UID','AccessToken','RefreshToken','Scopes','AccountName','Environment', 'LastUseData')])
 
+        # Build the state cache from what was just restored
+        self.__state_cache = self.__build_state()
+
     def __getstate__(self):
+        # The state is built only when it changed, as it's needed at each lock/unlock of the session.
+        # Callers get their own copy, as subclasses (and observers) may modify it.
+        if self.__state_cache is None:
+            self.__state_cache = self.__build_state()
+
+        data = dict(self.__state_cache)
+        if 'LastUseData' in data:
+            data['LastUseData'] = dict(data['LastUseData'])
+        return data
+
+    def __build_state(self):
         # If we don't have an UID, then we're not logged in and we don't want to store a specific state
         if self.UID is None:
             data = {}
@@ -689,19 +952,23 @@ class Session:
         """Lock the session, this has to be done when doing requests that affect the session state (i.e. :meth:`authenticate` for 
         instance), to prevent race conditions.
 
-        Internally, this is done using :class:`asyncio.Event`.
+        Internally, this is done using :class:`asyncio.Event` (see :meth:`_get_gate`).
 
         :param no_condition_check: Internal flag to disable locking, defaults to False
         :type no_condition_check: bool, optional
         """
         if no_condition_check:
             return
-        
-        if self.__can_run_requests is None:
-            self.__can_run_requests = asyncio.Event()
-        self.__can_run_requests.clear()
+
+        gate = self._get_gate()
+        if gate is not None:
+            gate.clear()
 
         # Lock observers (we're about to modify the session)
+        # Nothing to do (and no need to get the state) without observers, which is common
+        if not self.__persistence_observers:
+            return
+
         account_name = self.AccountName
         session_data = self.__getstate__()
         for observer in self.__persistence_observers:
@@ -719,21 +986,21 @@ class Session:
         if no_condition_check:
             return
         
-        if self.__can_run_requests is None:
-            self.__can_run_requests = asyncio.Event()
-        self.__can_run_requests.set()
+        gate = self._get_gate()
+        if gate is not None:
+            gate.set()
 
         # Only store data if we have an actual account (session not logged in shouldn't store data)
         # If we have a known account, use it
         if self.AccountName is not None:
             account_name = self.AccountName
-            session_data = self.__getstate__()
+            session_data = self.__getstate__() if self.__persistence_observers else None
         else:
             session_data = None
 
         # Unlock observers (we might have modified the session)
         # It's important to do it in reverse order, as otherwise there's a risk of deadlocks
-        for observer in reversed(self.__persistence_observers):
+        for observer in self.__persistence_observers_reversed:
             observer._release_session_lock(account_name, session_data)
 
     async def _requests_wait(self, no_condition_check=False):
@@ -744,15 +1011,41 @@ class Session:
         """
         if no_condition_check or self.__can_run_requests is None:
             return
-        
-        await self.__can_run_requests.wait()
 
+        await self._get_gate().wait()
+
+    def _get_gate(self) -> Optional[asyncio.Event]:
+        """Get the event that is cleared while the session is locked, for the running event loop.
 
-    async def __sleep_for_exception(self, e):
-        if e.http_headers.get('retry-after','-').isnumeric():
-            await asyncio.sleep(int(e.http_headers.get('retry-after')))
+        :class:`asyncio.Event` objects are bound to an event loop, so there's one per loop (they go away with their loop).
+
+        :return: the event for the running loop, or None if there's no running loop (then nothing can be waiting for it)
+        :rtype: Optional[asyncio.Event]
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+        if self.__can_run_requests is None:
+            self.__can_run_requests = weakref.WeakKeyDictionary()
+        gate = self.__can_run_requests.get(loop)
+        if gate is None:
+            gate = asyncio.Event()
+            gate.set()
+            self.__can_run_requests[loop] = gate
+        return gate
+
+
+    async def __sleep_before_retry(self, http_headers, attempt, policy):
+        # Header names are case-insensitive, but http_headers might be a plain dict (i.e. ProtonAPIError.http_headers)
+        retry_after = next((value for name, value in http_headers.items() if name.lower() == 'retry-after'), None)
+        # Retry-After is either a number of seconds (ASCII digits), or a HTTP date (which we don't handle)
+        if retry_after is not None and retry_after.isascii() and retry_after.isdigit():
+            retry_after = int(retry_after)
         else:
-            await asyncio.sleep(3+random.random()*5) # nosec (no crypto risk here of using an unsafe generator)
+            retry_after = None
+        await _sleep_backoff(attempt, policy.base_delay, policy.max_delay, policy.jitter, retry_after)
 
     async def __async_api_request_internal(
         self, endpoint,
@@ -761,16 +1054,63 @@ class Session:
     ):
         """Internal function to do an API request (without clever exception handling and retrying). 
         See :meth:`async_api_request` for the parameters specification."""
+        http_code, http_headers, json_data = await self.__async_api_request_internal_raw(endpoint, jsondata, data, additional_headers, method, params, no_condition_check)
+        if json_data.get('Code') not in (1000, 1001):
+            raise ProtonAPIError(http_code, dict(http_headers), json_data)
+        return json_data
+
+    async def __async_api_request_internal_raw(
+        self, endpoint,
+        jsondata=None, data=None, additional_headers=None,
+        method=None, params=None, no_condition_check=False
+    ):
+        """Same as :meth:`__async_api_request_internal`, but API errors are returned instead of raised.
+
+        :return: tuple (http_code, http_headers, json_data)
+        :rtype: tuple[int, dict, dict]
+        """
         # Should (and can we) create a transport
-        if self.__transport is None and self.__transport_factory is not None:
-            self.__transport = self.__transport_factory(self)
+        if self.__transport is None:
+            self.__transport = self.transport_factory(self)
         if self.__transport is None:
             raise RuntimeError("Could not instanciate a transport, are required dependencies installed?")
 
         await self._requests_wait(no_condition_check)
-        return await self.__transport.async_api_request(endpoint, jsondata, data, additional_headers, method, params)
+        return await _get_async_api_request_raw()(self.__transport, endpoint, jsondata, data, additional_headers, method, params)
+
+    async def _verify_modulus(self, armored_modulus) -> bytes:
+        """Verify the signature of the SRP modulus, and return it decoded (see :meth:`_verify_modulus_sync`).
+
+        PGPy verifies it in-process, but gnupg runs a subprocess: in that case, it's done in a thread so the event loop isn't blocked.
+        """
+        if _pgpy_modulus_key() is not None:
+            return self._verify_modulus_sync(armored_modulus)
+
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(None, context.run, self._verify_modulus_sync, armored_modulus)
+
+    def _verify_modulus_sync(self, armored_modulus) -> bytes:
+        modulus_key = _pgpy_modulus_key()
+        if modulus_key is None:
+            return self.__verify_modulus_with_gnupg(armored_modulus)
+
+        import pgpy
+        try:
+            message = pgpy.PGPMessage.from_blob(armored_modulus)
+            verified = modulus_key.verify(message)
+        except (ValueError, pgpy.errors.PGPError) as e:
+            raise ProtonCryptoError('Invalid modulus') from e
+
+        # sig.by is the key we verified with (always the modulus key), so check the key ID the signature claims
+        # instead: it has to be the one of the pinned key (i.e. the low 64 bits of its fingerprint).
+        signers = [sig.signature.signer.lower() for sig in verified.good_signatures]
+        if not (verified and SRP_MODULUS_KEY_FINGERPRINT[-16:] in signers):
+            raise ProtonCryptoError('Invalid modulus')
 
-    def _verify_modulus(self, armored_modulus) -> bytes:
+        return base64.b64decode(message.message.strip())
+
+    def __verify_modulus_with_gnupg(self, armored_modulus) -> bytes:
         if self.__gnupg_for_modulus is None:
             import gnupg
             # The modulus key is imported in a separate GPG keyring (rather than on the user's
@@ -791,7 +1131,3 @@ class Session:
             raise ProtonCryptoError('Invalid modulus')
 
         return base64.b64decode(verified.data.strip())
-
-
-
-
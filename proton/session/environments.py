@@ -17,14 +17,19 @@ You should have received a copy of the GNU General Public License
 along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
 """
 import abc
+import base64
 from typing import Union, Optional
 
 class Environment(metaclass=abc.ABCMeta):
-    @property
-    def name(cls):
-        cls_name = cls.__class__.__name__
-        assert cls_name.endswith('Environment'), "Incorrectly named class" # nosec (dev should ensure that to avoid issues)
-        return cls_name[:-11].lower()
+    __slots__ = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # The name is derived from the class name, unless the subclass provides its own
+        if 'name' not in cls.__dict__:
+            cls_name = cls.__name__
+            assert cls_name.endswith('Environment'), "Incorrectly named class" # nosec (dev should ensure that to avoid issues)
+            cls.name = cls_name[:-len('Environment')].lower()
 
     @property
     def http_extra_headers(self):
@@ -51,9 +56,27 @@ class Environment(metaclass=abc.ABCMeta):
             return False
         return self.name == other.name
 
+    def __hash__(self):
+        return hash(self.name)
+
 
 
 class ProdEnvironment(Environment):
+    __slots__ = ()
+
+    # SHA-256 of the pinned public keys (SPKI), decoded once
+    _TLS_PINS = frozenset(base64.b64decode(h) for h in (
+        "CT56BhOTmj5ZIPgb/xD5mH8rY3BLo/MlhP7oPyJUEDo=",
+        "35Dx28/uzN3LeltkCBQ8RHK0tlNSa2kCpCRGNp34Gxc=",
+        "qYIukVc63DEITct8sFT7ebIq5qsWmuscaIKeJx+5J5A=",
+    ))
+    _TLS_PINS_AR = frozenset(base64.b64decode(h) for h in (
+        "EU6TS9MO0L/GsDHvVc9D5fChYLNy5JdGYpJw0ccgetM=",
+        "iKPIHPnDNqdkvOnTClQ8zQAIKG0XavaPkcEo0LBAABA=",
+        "MSlVrBCdL0hKyczvgYVSRNm88RicyY04Q2y5qrBt0xA=",
+        "C2UxW0T1Ckl9s+8cXfjXxlEqwAfPM4HiW2y3UdtBeCw=",
+    ))
+
     @classmethod
     def _get_priority(cls):
         return 10
@@ -64,17 +87,8 @@ class ProdEnvironment(Environment):
 
     @property
     def tls_pinning_hashes(self):
-        return set([
-            "CT56BhOTmj5ZIPgb/xD5mH8rY3BLo/MlhP7oPyJUEDo=",
-            "35Dx28/uzN3LeltkCBQ8RHK0tlNSa2kCpCRGNp34Gxc=",
-            "qYIukVc63DEITct8sFT7ebIq5qsWmuscaIKeJx+5J5A=",
-        ])
+        return self._TLS_PINS
 
     @property
     def tls_pinning_hashes_ar(self):
-        return set([
-            "EU6TS9MO0L/GsDHvVc9D5fChYLNy5JdGYpJw0ccgetM=",
-            "iKPIHPnDNqdkvOnTClQ8zQAIKG0XavaPkcEo0LBAABA=",
-            "MSlVrBCdL0hKyczvgYVSRNm88RicyY04Q2y5qrBt0xA=",
-            "C2UxW0T1Ckl9s+8cXfjXxlEqwAfPM4HiW2y3UdtBeCw="
-        ])
+        return self._TLS_PINS_AR
@@ -32,12 +32,10 @@ from typing import Iterable, Union, Optional
 class AiohttpCertkeyFingerprint(aiohttp.Fingerprint):
     def __init__(self, fingerprints: Optional[Iterable[Union[bytes, str]]]) -> None:
         if fingerprints is not None:
-            self._fingerprints = []
-            for fp in fingerprints:
-                if type(fp) == str:
-                    self._fingerprints.append(base64.b64decode(fp))
-                else:
-                    self._fingerprints.append(fp)
+            self._fingerprints = frozenset(
+                base64.b64decode(fp) if isinstance(fp, str) else fp
+                for fp in fingerprints
+            )
         else:
             self._fingerprints = None
 
@@ -83,6 +81,13 @@ class AiohttpTransport(Transport):
         self, endpoint,
         jsondata=None, data=None, additional_headers=None,
         method=None, params=None
+    ):
+        return self._api_reply_or_raise(*await self.async_api_request_raw(endpoint, jsondata, data, additional_headers, method, params))
+
+    async def async_api_request_raw(
+        self, endpoint,
+        jsondata=None, data=None, additional_headers=None,
+        method=None, params=None
     ):
         if self.tls_pinning_hashes is not None:
             ssl_specs = AiohttpCertkeyFingerprint(self.tls_pinning_hashes)
@@ -132,20 +137,15 @@ class AiohttpTransport(Transport):
                     try:
                         ret_json = await ret.json()
                     except json.decoder.JSONDecodeError:
-                        raise ProtonAPIError(ret.status, dict(ret.headers), {})
+                        ret_json = {}
 
-                if ret_json['Code'] not in [1000, 1001]:
-                    raise ProtonAPIError(ret.status, dict(ret.headers), ret_json)
-
-                return ret_json
+                return ret.status, ret.headers, ret_json
             except aiohttp.ClientError as e:
                 raise ProtonAPINotReachable("Connection error.") from e
             except asyncio.TimeoutError as e:
                 raise ProtonAPINotReachable("Timeout error.") from e
             except ProtonAPINotReachable:
                 raise
-            except ProtonAPIError:
-                raise
             except Exception as e:
                 raise ProtonAPIUnexpectedError(e)
 
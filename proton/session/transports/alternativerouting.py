@@ -181,7 +181,7 @@ class AlternativeRoutingTransport(AiohttpTransport):
     def tls_pinning_hashes(self):
         return self._environment.tls_pinning_hashes_ar
 
-    async def async_api_request(
+    async def async_api_request_raw(
         self, endpoint,
         jsondata=None, data=None, additional_headers=None,
         method=None, params=None
@@ -189,4 +189,4 @@ class AlternativeRoutingTransport(AiohttpTransport):
         if len(self._alternative_routes) == 0 or self._alternative_routes[0].expiration_time < time.time():
             await self._get_alternative_routes()
 
-        return await super().async_api_request(endpoint, jsondata, data, additional_headers, method, params)
+        return await super().async_api_request_raw(endpoint, jsondata, data, additional_headers, method, params)
@@ -23,7 +23,7 @@ from urllib.parse import urlparse
 import json, base64, struct, time, asyncio, random, itertools
 
 from ..exceptions import *
-from .base import Transport
+from .base import Transport, _async_api_request_raw
 from .aiohttp import AiohttpTransport
 from .alternativerouting import AlternativeRoutingTransport
 from ..api import sync_wrapper
@@ -115,6 +115,12 @@ class AutoTransport(Transport):
     async def async_api_request(
         self, endpoint,
         jsondata=None, data=None, additional_headers=None, method=None, params=None
+    ):
+        return self._api_reply_or_raise(*await self.async_api_request_raw(endpoint, jsondata, data, additional_headers, method, params))
+
+    async def async_api_request_raw(
+        self, endpoint,
+        jsondata=None, data=None, additional_headers=None, method=None, params=None
     ):
         tries_left = 3
         while tries_left > 0:
@@ -123,7 +129,7 @@ class AutoTransport(Transport):
                 await self.find_available_transport()
 
             try:
-                return await asyncio.wait_for(self._current_transport.async_api_request(endpoint, jsondata, data, additional_headers, method, params), self._transport_timeout)
+                return await asyncio.wait_for(_async_api_request_raw(self._current_transport, endpoint, jsondata, data, additional_headers, method, params), self._transport_timeout)
             except asyncio.TimeoutError:
                 # Reset transport
                 self._current_transport = None
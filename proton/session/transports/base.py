@@ -18,6 +18,8 @@ along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
 """
 import weakref
 
+from ..exceptions import ProtonAPIError, ProtonAPIUnexpectedError
+
 class Transport:
     def __init__(self, session):
         self.__session = weakref.ref(session)
@@ -48,6 +50,57 @@ class Transport:
     ):
         raise NotImplementedError("async_api_request should be implemented")
 
+    # Transports can also implement async_api_request_raw(), with the same parameters as async_api_request().
+    # It returns a tuple (http_code, http_headers, json_data) instead of raising ProtonAPIError when the API
+    # returns an error, which lets the session handle retries without exceptions. http_headers can be any mapping.
+
+    @staticmethod
+    def _api_reply_or_raise(http_code, http_headers, json_data):
+        """Return the JSON data of an API reply, or raise :class:`ProtonAPIError` if it's an error (to implement
+        ``async_api_request`` on top of ``async_api_request_raw``).
+
+        :raises ProtonAPIError: if the API didn't return a 1000/1001 code
+        :raises ProtonAPIUnexpectedError: if the reply is malformed (see :func:`_check_api_reply`)
+        :return: JSON data
+        :rtype: dict
+        """
+        _check_api_reply(http_code, http_headers, json_data)
+        if json_data.get('Code') not in (1000, 1001):
+            raise ProtonAPIError(http_code, dict(http_headers), json_data)
+        return json_data
+
+def _check_api_reply(http_code, http_headers, json_data):
+    """Check that an API reply can be handled: it has to be a JSON object, and errors need a ``Code`` and an ``Error``
+    (see :class:`ProtonAPIError`).
+
+    :raises ProtonAPIUnexpectedError: if the reply is malformed
+    """
+    if not isinstance(json_data, dict):
+        raise ProtonAPIUnexpectedError(f"Unexpected API reply [HTTP/{http_code}]: not a JSON object")
+    if json_data.get('Code') not in (1000, 1001) and ('Code' not in json_data or 'Error' not in json_data):
+        raise ProtonAPIUnexpectedError(f"Unexpected API reply [HTTP/{http_code}]: error without Code or Error")
+
+
+async def _async_api_request_raw(transport, *args):
+    """Call ``transport.async_api_request_raw(*args)``, falling back to ``async_api_request`` for transports that don't implement it.
+
+    :raises ProtonAPIUnexpectedError: if the reply is malformed (see :func:`_check_api_reply`)
+    :return: tuple (http_code, http_headers, json_data)
+    :rtype: tuple[int, dict, dict]
+    """
+    request_raw = getattr(transport, 'async_api_request_raw', None)
+    if request_raw is not None:
+        reply = await request_raw(*args)
+        _check_api_reply(*reply)
+        return reply
+
+    try:
+        # We don't know the actual HTTP code, but it succeeded
+        return 200, {}, await transport.async_api_request(*args)
+    except ProtonAPIError as e:
+        return e.http_code, e.http_headers, e.json_data
+
+
 class TransportFactory:
     def __init__(self, cls, *args, **kwargs):
         self._cls = cls
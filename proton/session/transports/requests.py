@@ -45,6 +45,13 @@ class RequestsTransport(Transport):
         self, endpoint,
         jsondata=None, data=None, additional_headers=None,
         method=None, params=None
+    ):
+        return self._api_reply_or_raise(*await self.async_api_request_raw(endpoint, jsondata, data, additional_headers, method, params))
+
+    async def async_api_request_raw(
+        self, endpoint,
+        jsondata=None, data=None, additional_headers=None,
+        method=None, params=None
     ):
         self._s.headers['x-pm-appversion'] = self._session.appversion
         self._s.headers['User-Agent'] = self._session.user_agent
@@ -90,12 +97,9 @@ class RequestsTransport(Transport):
         try:
             ret_json = ret.json()
         except json.decoder.JSONDecodeError:
-            raise ProtonAPIError(ret.status_code, dict(ret.headers), {})
-
-        if ret_json['Code'] not in [1000, 1001]:
-            raise ProtonAPIError(ret.status_code, dict(ret.headers), ret_json)
+            ret_json = {}
 
-        return ret_json
+        return ret.status_code, ret.headers, ret_json
 
     @staticmethod
     def _get_requests_data(form_data: FormData) -> dict:
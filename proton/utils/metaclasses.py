@@ -16,11 +16,22 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
 """
+import threading
 
 
 class Singleton(type):
     _instances = {}
+    # Reentrant, as a singleton might create another one while being constructed
+    _lock = threading.RLock()
+
     def __call__(cls, *args, **kwargs):
-        if cls not in cls._instances:
-            cls._instances[cls] = super(Singleton, cls).__call__(*args, **kwargs)
-        return cls._instances[cls]
\ No newline at end of file
+        # Fast path: the instance already exists, no need to lock
+        instance = cls._instances.get(cls)
+        if instance is None:
+            with Singleton._lock:
+                # Check again, another thread might have created it while we were waiting
+                instance = cls._instances.get(cls)
+                if instance is None:
+                    instance = super(Singleton, cls).__call__(*args, **kwargs)
+                    cls._instances[cls] = instance
+        return instance
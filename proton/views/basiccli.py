@@ -68,6 +68,8 @@ class BasicCLIView(BasicView):
                     print(f"- {self._session_to_string(s, sessions[0])}")
 
             if ask_to_select_one:
+                # Reversed, so the first session is kept if several have the same account name
+                sessions_by_name = {s.AccountName: s for s in reversed(sorted_sessions)}
                 while True:
                     user_input = input("Please select a session: ") # nosec (Python 3 only code)
                     if user_input.isnumeric():
@@ -77,9 +79,9 @@ class BasicCLIView(BasicView):
                         else: 
                             print("Invalid input!")
                     else:
-                        for s in sorted_sessions:
-                            if s.AccountName == user_input:
-                                return s
+                        selected_session = sessions_by_name.get(user_input)
+                        if selected_session is not None:
+                            return selected_session
                         print("Invalid input!")
 
     def ask_credentials(self, ask_login: bool = False, ask_password: bool = False, ask_2fa: bool = False) -> tuple[Optional[str], Optional[str], Optional[str]]:
@@ -24,6 +24,7 @@ BuildRequires: python3-pyOpenSSL
 BuildRequires: python3-requests
 BuildRequires: python3-aiohttp
 BuildRequires: python3-importlib-metadata
+Recommends: python3-pgpy
 BuildRequires: python3-pyotp
 BuildRequires: python3-setuptools
 Requires: python3-bcrypt
@@ -11,7 +11,9 @@ setup(
     url="https://github.com/ProtonMail/python-proton-core",
     install_requires=["requests", "bcrypt", "python-gnupg", "pyopenssl", "aiohttp"],
     extras_require={
-        "test": ["pytest", "pyotp", "pytest-cov", "flake8"]
+        "test": ["pytest", "pyotp", "pytest-cov", "flake8"],
+        # Verifies the SRP modulus in-process (python-gnupg, which runs gpg, is used otherwise)
+        "pgpy": ["PGPy"],
     },
     entry_points={
         "proton_loader_keyring": [
@@ -17,13 +17,14 @@ You should have received a copy of the GNU General Public License
 along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
 """
 import unittest
+from unittest.mock import Mock, patch
 
 import base64
 from testdata import srp_instances, modulus_instances
 from testserver import TestServer
 from proton.session.srp.util import PM_VERSION
 from proton.session.api import Session
-from proton.session.exceptions import ProtonUnsupportedAuthVersionError
+from proton.session.exceptions import ProtonCryptoError, ProtonUnsupportedAuthVersionError
 
 
 class SRPTestCases:
@@ -179,20 +180,39 @@ class TestPYSRPClass(SRPTestCases.SRPTestBase):
         self.user = PYUser
 
 
-class TestModulus(unittest.TestCase):
-    def test_modulus_verification(self):
+class TestModulus(unittest.IsolatedAsyncioTestCase):
+    async def test_modulus_verification(self):
         session = Session('dummy')
         for instance in modulus_instances:
             if instance["Exception"] is not None:
                 with self.assertRaises(instance['Exception']):
-                    session._verify_modulus(instance["SignedModulus"])
+                    await session._verify_modulus(instance["SignedModulus"])
             else:
                 self.assertEqual(
                     base64.b64decode(instance["Decoded"]),
-                    session._verify_modulus(instance["SignedModulus"]),
+                    await session._verify_modulus(instance["SignedModulus"]),
                     "Error verifying modulus in instance: " + str(instance)[:30] + "..."
                 )
 
+    async def test_modulus_verification_with_gnupg(self):
+        # Without PGPy, we fall back to gnupg
+        with patch('proton.session.api._pgpy_modulus_key', return_value=None):
+            await self.test_modulus_verification()
+
+    async def test_modulus_signed_by_other_key(self):
+        # A good signature is not enough, it has to be issued by the pinned key
+        from proton.session.api import _pgpy_modulus_key
+        modulus_key = _pgpy_modulus_key()
+        if modulus_key is None:
+            self.skipTest("PGPy is not available")
+
+        instance = next(instance for instance in modulus_instances if instance["Exception"] is None)
+        signature = Mock(signature=Mock(signer="0123456789ABCDEF"), by=modulus_key)
+        verified = Mock(good_signatures=[signature])
+        with patch.object(type(modulus_key), 'verify', return_value=verified):
+            with self.assertRaises(ProtonCryptoError):
+                await Session('dummy')._verify_modulus(instance["SignedModulus"])
+
 
 if __name__ == '__main__':
     unittest.main()
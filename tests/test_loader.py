@@ -18,6 +18,7 @@ along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
 """
 import unittest
 import os
+from unittest.mock import patch
 
 from proton.session.environments import Environment
 
@@ -143,3 +144,115 @@ class LoaderTest(unittest.TestCase):
         assert self._loader.get('environment') == ProdEnvironment
 
         assert self._loader.get_name(ProdEnvironment) == ('environment','prod')
+
+    def test_entry_points_scanned_once(self):
+        from importlib import metadata
+
+        self._loader.refresh_entry_points()
+        with patch('proton.loader.loader.metadata.entry_points', wraps=metadata.entry_points) as entry_points:
+            _ = self._loader.type_names
+            _ = self._loader.get_all('environment')
+            _ = self._loader.type_names
+            assert entry_points.call_count == 1
+
+            self._loader.refresh_entry_points()
+            _ = self._loader.type_names
+            assert entry_points.call_count == 2
+        self._loader.refresh_entry_points()
+
+    def test_overrides_changed_at_runtime(self):
+        from proton.session.environments import ProdEnvironment
+
+        self._loader.set_all('environment', {'prod': ProdEnvironment, 'dummytest1': DummyTest1Environment})
+        env_backup = os.environ.copy()
+        try:
+            os.environ['PROTON_API_ENVIRONMENT'] = 'prod'
+            os.environ['PROTON_LOADER_OVERRIDES'] = 'environment=-prod'
+            assert self._loader.get('environment') == DummyTest1Environment
+            assert [x.priority for x in self._loader.get_all('environment') if x.class_name == 'prod'] == [None]
+
+            os.environ['PROTON_LOADER_OVERRIDES'] = ''
+            assert self._loader.get('environment') == ProdEnvironment
+
+            # Comma separated, as documented
+            os.environ['PROTON_LOADER_OVERRIDES'] = 'keyring=json,environment=-prod'
+            assert self._loader.get('environment') == DummyTest1Environment
+            os.environ['PROTON_LOADER_OVERRIDES'] = 'environment=-dummytest1, environment=-prod'
+            with self.assertRaises(RuntimeError):
+                _ = self._loader.get('environment')
+
+            os.environ['PROTON_LOADER_OVERRIDES'] = 'environment=unknown'
+            with self.assertRaises(RuntimeError):
+                _ = self._loader.get('environment')
+
+            os.environ['PROTON_LOADER_OVERRIDES'] = 'environment=prod environment=dummytest1'
+            with self.assertRaises(RuntimeError):
+                _ = self._loader.get_all('environment')
+
+            # Overrides for other types don't matter
+            os.environ['PROTON_LOADER_OVERRIDES'] = 'keyring=a keyring=b environment=dummytest1'
+            assert self._loader.get('environment') == DummyTest1Environment
+        finally:
+            os.environ.clear()
+            os.environ.update(env_backup)
+
+    def test_replaced_implementations_are_not_kept_alive(self):
+        import gc
+        import weakref
+
+        class DummyTest4Environment(DummyTest1Environment):
+            pass
+
+        self._loader.set_all('environment', {'dummytest4': DummyTest4Environment})
+        assert self._loader.get('environment') == DummyTest4Environment
+        assert self._loader.get_name(DummyTest4Environment) == ('environment', 'dummytest4')
+
+        ref = weakref.ref(DummyTest4Environment)
+        self._loader.set_all('environment', {'dummytest1': DummyTest1Environment})
+        del DummyTest4Environment
+        gc.collect()
+        assert ref() is None
+
+    def test_get_all_result_reused_until_priorities_change(self):
+        self._loader.set_all('environment', {'dummytest1': DummyTest1Environment, 'dummytest2': DummyTest2Environment})
+        env_backup = os.environ.copy()
+        try:
+            os.environ['PROTON_API_ENVIRONMENT'] = 'dummytest1'
+            first = self._loader.get_all('environment')
+            assert isinstance(first, tuple)
+            assert self._loader.get_all('environment') is first
+            assert first[0].cls == DummyTest1Environment
+
+            os.environ['PROTON_API_ENVIRONMENT'] = 'dummytest2'
+            assert self._loader.get_all('environment')[0].cls == DummyTest2Environment
+        finally:
+            os.environ.clear()
+            os.environ.update(env_backup)
+
+    def test_prewarm(self):
+        self._loader.prewarm().join()
+        # Everything is loaded already, so the entry points must not be needed any more
+        with patch.object(type(self._loader), '_proton_entry_points_for', side_effect=AssertionError):
+            for type_name in self._loader.type_names:
+                _ = self._loader.get_all(type_name)
+
+    def test_resolver(self):
+        class DummyTest5Environment(DummyTest1Environment):
+            validate_calls = 0
+
+            @classmethod
+            def _get_priority(cls):
+                return 1000
+
+            @classmethod
+            def _validate(cls):
+                cls.validate_calls += 1
+                return False
+
+        self._loader.set_all('environment', {'dummytest5': DummyTest5Environment, 'dummytest1': DummyTest1Environment})
+        resolve = self._loader.resolver('environment')
+        assert resolve() == DummyTest1Environment
+        # DummyTest5Environment failed validation, so it's not considered any more
+        assert resolve() == DummyTest1Environment
+        assert DummyTest5Environment.validate_calls == 1
+        assert self._loader.get('environment') == DummyTest1Environment
@@ -17,13 +17,17 @@ You should have received a copy of the GNU General Public License
 along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
 """
 import asyncio
+import gc
+import inspect
+import threading
 import unittest
 import os
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, Mock, patch
 import pyotp
 
 from proton.session import Session
-from proton.session.exceptions import ProtonAPIError
+from proton.session.api import sync_wrapper, _RetryPolicy
+from proton.session.exceptions import ProtonAPIError, ProtonAPIAuthenticationNeeded, ProtonAPIMissingScopeError, ProtonAPIHumanVerificationNeeded, ProtonAPIUnexpectedError
 from proton.session.transports import TransportFactory
 
 
@@ -120,6 +124,201 @@ class TestSession(unittest.IsolatedAsyncioTestCase):
         _, args, _ = mock_calls[2]
         assert args[1] == "/vpn/someroute"
 
+        # Refresh changed the tokens, so the persisted state should reflect it
+        assert s.__getstate__()["AccessToken"] == refresh_reply["AccessToken"]
+        assert s.__getstate__()["RefreshToken"] == refresh_reply["RefreshToken"]
+
+    async def test_retry_with_backoff(self):
+        replies = [
+            ProtonAPIError(503, {}, {"Code": 503, "Error": "Unavailable"}),
+            ProtonAPIError(429, {"Retry-After": "7"}, {"Code": 429, "Error": "Too many requests"}),
+            {"Code": 1000},
+        ]
+
+        class MyMockTransport:
+            def __init__(self, session: "Session", *args, **kwargs) -> None:
+                pass
+
+            async def async_api_request(self, endpoint, *args, **kwargs):
+                reply = replies.pop(0)
+                if isinstance(reply, Exception):
+                    raise reply
+                return reply
+
+        s = Session()
+        s.transport_factory = TransportFactory(cls=MyMockTransport)
+
+        with patch("proton.session.api._sleep_backoff", new_callable=AsyncMock) as sleep_backoff:
+            assert await s.async_api_request("/tests/ping") == {"Code": 1000}
+
+        assert [call.args[0] for call in sleep_backoff.mock_calls] == [0, 1]
+        # Retry-After has to be honored
+        assert sleep_backoff.mock_calls[0].args[4] is None
+        assert sleep_backoff.mock_calls[1].args[4] == 7
+
+    async def test_retries_are_bounded_by_policy(self):
+        calls = []
+
+        class MyMockRawTransport:
+            def __init__(self, session: "Session", *args, **kwargs) -> None:
+                pass
+
+            async def async_api_request_raw(self, endpoint, *args, **kwargs):
+                calls.append(endpoint)
+                return (503, {}, {"Code": 503, "Error": "Unavailable"})
+
+        s = Session()
+        s.transport_factory = TransportFactory(cls=MyMockRawTransport)
+
+        for attempts in (1, 5):
+            calls.clear()
+            policy = {503: _RetryPolicy(attempts, 1.0, 30, 0.5)}
+            with patch("proton.session.api.RETRY_POLICY", policy), \
+                    patch("proton.session.api._sleep_backoff", new_callable=AsyncMock) as sleep_backoff:
+                with self.assertRaises(ProtonAPIError):
+                    await s.async_api_request("/route")
+            assert len(calls) == attempts
+            assert sleep_backoff.await_count == attempts - 1
+
+    async def test_api_errors_from_raw_transport(self):
+        replies = {}
+
+        class MyMockRawTransport:
+            def __init__(self, session: "Session", *args, **kwargs) -> None:
+                pass
+
+            async def async_api_request_raw(self, endpoint, *args, **kwargs):
+                return replies[endpoint]
+
+        s = Session()
+        s.transport_factory = TransportFactory(cls=MyMockRawTransport)
+
+        replies["/auth/refresh"] = (400, {}, {"Code": 2001, "Error": "Invalid refresh token"})
+        for reply, exception in (
+            ((403, {}, {"Code": 2011, "Error": "Missing scope"}), ProtonAPIMissingScopeError),
+            ((401, {}, {"Code": 401, "Error": "Expired"}), ProtonAPIAuthenticationNeeded),
+            ((422, {}, {"Code": 9001, "Error": "Human verification"}), ProtonAPIHumanVerificationNeeded),
+            ((503, {"Retry-After": "1"}, {"Code": 503, "Error": "Unavailable"}), ProtonAPIError),
+        ):
+            replies["/route"] = reply
+            with patch("proton.session.api._sleep_backoff", new_callable=AsyncMock):
+                with self.assertRaises(exception) as cm:
+                    await s.async_api_request("/route")
+            assert type(cm.exception) is exception
+            assert cm.exception.http_code == reply[0]
+            assert cm.exception.http_headers == reply[1]
+            assert cm.exception.json_data == reply[2]
+
+        replies["/route"] = (200, {}, {"Code": 1000})
+        assert await s.async_api_request("/route") == {"Code": 1000}
+
+        # Malformed replies (i.e. empty, when it isn't JSON)
+        for reply in ((500, {}, {}), (422, {}, {"Code": 2001}), (200, {}, [])):
+            replies["/route"] = reply
+            with self.assertRaises(ProtonAPIUnexpectedError):
+                await s.async_api_request("/route")
+
+    async def test_subclass_extending_state_is_persisted(self):
+        class SessionWithAdditionalData(Session):
+            def __init__(self, *a, **kw):
+                self.additional_data = None
+                super().__init__(*a, **kw)
+
+            def __getstate__(self):
+                d = super().__getstate__()
+                if self.additional_data is not None:
+                    d['additional_data'] = self.additional_data
+                return d
+
+        s = SessionWithAdditionalData()
+        s.__setstate__({"UID": "uid", "AccessToken": "a", "RefreshToken": "r", "Scopes": [], "Environment": "prod", "AccountName": "test"})
+        observer = Mock()
+        s.register_persistence_observer(observer)
+
+        s._requests_lock()
+        s.additional_data = 'abc123'
+        s._requests_unlock()
+
+        # Observers (i.e. the SSO) only persist the state if it changed
+        _, acquired_data = observer._acquire_session_lock.call_args.args
+        _, released_data = observer._release_session_lock.call_args.args
+        assert 'additional_data' not in acquired_data
+        assert released_data['additional_data'] == 'abc123'
+        assert acquired_data != released_data
+
+    def test_state_is_rebuilt_only_on_change(self):
+        s = Session()
+        s.__setstate__({"UID": "uid", "AccessToken": "a", "RefreshToken": "r", "Scopes": [], "Environment": "prod", "AccountName": "test"})
+
+        state = s.__getstate__()
+        state_cache = s._Session__state_cache
+        state["Scopes"] = None
+        assert s._Session__state_cache is state_cache
+        assert s.__getstate__() != state
+        state["Scopes"] = []
+        assert s.__getstate__() == state
+
+        s._clear_local_data()
+        assert s.__getstate__() == {}
+        state_cache = s._Session__state_cache
+
+        # Nothing changes, so the cached state can be kept
+        s._clear_local_data()
+        assert s._Session__state_cache is state_cache
+        assert s.__getstate__() == {}
+
+
+async def _coroutine_with_reserved_parameter_name(__sync_wrapped_f):
+    return __sync_wrapped_f
+
+
+class TestSyncWrapper(unittest.TestCase):
+    def test_event_loop_is_reused(self):
+        async def get_loop():
+            return asyncio.get_running_loop()
+
+        sync_get_loop = sync_wrapper(get_loop)
+        loop = sync_get_loop()
+        assert not loop.is_closed()
+        assert sync_get_loop() is loop
+
+    def test_event_loop_is_closed_when_thread_ends(self):
+        async def get_loop():
+            return asyncio.get_running_loop()
+
+        loops = []
+        thread = threading.Thread(target=lambda: loops.append(sync_wrapper(get_loop)()))
+        thread.start()
+        thread.join()
+        del thread
+        gc.collect()
+
+        assert len(loops) == 1
+        assert loops[0].is_closed()
+
+    def test_same_signature(self):
+        async def f(a, b=1, *args, c, d=None, **kwargs):
+            return a, b, args, c, d, kwargs
+
+        sync_f = sync_wrapper(f)
+        assert sync_f(0, c=2) == (0, 1, (), 2, None, {})
+        assert sync_f(0, 1, 2, 3, c=4, d=5, e=6) == (0, 1, (2, 3), 4, 5, {'e': 6})
+        assert str(inspect.signature(sync_f)) == str(inspect.signature(f))
+        assert Session.api_request.__defaults__ == Session.async_api_request.__defaults__
+        assert Session.api_request.__module__ == 'proton.session.api'
+        for wrapper, wrapped in ((sync_f, f), (sync_wrapper(_coroutine_with_reserved_parameter_name), _coroutine_with_reserved_parameter_name)):
+            assert (wrapper.__module__, wrapper.__name__, wrapper.__qualname__) == (wrapped.__module__, wrapped.__name__, wrapped.__qualname__)
+
+    def test_parameter_names_dont_shadow_wrapper_names(self):
+        async def g(self, f=None, get_running_loop=None, get_sync_loop=None, RuntimeError=None):
+            return self, f, get_running_loop, get_sync_loop, RuntimeError
+
+        assert sync_wrapper(g)(1, f=3) == (1, 3, None, None, None)
+        assert sync_wrapper(g)(1, 2, 3, 4, 5) == (1, 2, 3, 4, 5)
+
+        # Parameters named as the wrapper globals get a generic wrapper (defined at module level, as names would be mangled here)
+        assert sync_wrapper(_coroutine_with_reserved_parameter_name)(1) == 1
+
 
 class TestSessionUsingApi(unittest.IsolatedAsyncioTestCase):
     """This class contain test that will use the atlas environment of Proton API to
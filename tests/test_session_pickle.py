@@ -35,6 +35,8 @@ class TestSessionPickle(unittest.IsolatedAsyncioTestCase):
         pickled_session = pickle.loads(pickle.dumps(s))
         assert isinstance(pickled_session, Session)
 
-        assert s.__dict__ == pickled_session.__dict__
+        for attr in Session.__slots__:
+            if attr != '__weakref__':
+                assert getattr(s, attr) == getattr(pickled_session, attr), attr
 
         # we can't do much more testing as we don't log in in API in the tests...